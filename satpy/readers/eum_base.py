@@ -17,6 +17,7 @@
 # satpy.  If not, see <http://www.gnu.org/licenses/>.
 """Utilities for EUMETSAT satellite data."""
 
+from collections.abc import Mapping
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -25,6 +26,7 @@ time_cds_short = [('Days', '>u2'), ('Milliseconds', '>u4')]
 time_cds = time_cds_short + [('Microseconds', '>u2')]
 time_cds_expanded = time_cds + [('Nanoseconds', '>u2')]
 issue_revision = [('Issue', np.uint16), ('Revision', np.uint16)]
+_TCDS_TYPES = [time_cds_short, time_cds, time_cds_expanded]
 
 
 def timecds2datetime(tcds):
@@ -53,32 +55,65 @@ def timecds2datetime(tcds):
 def recarray2dict(arr):
     """Convert numpy record array to a dictionary."""
     res = {}
-    tcds_types = [time_cds_short, time_cds, time_cds_expanded]
 
     for dtuple in arr.dtype.descr:
         key = dtuple[0]
         ntype = dtuple[1]
-        data = arr[key]
-        if ntype in tcds_types:
-            if data.size > 1:
-                res[key] = np.array([timecds2datetime(item)
-                                     for item in data.ravel()]).reshape(data.shape)
-            else:
-                res[key] = timecds2datetime(data)
-        elif isinstance(ntype, list):
-            res[key] = recarray2dict(data)
-        else:
-            if data.size == 1:
-                data = data[0]
-                if ntype[:2] == '|S':
-                    # Python2 and Python3 handle strings differently
-                    try:
-                        data = data.decode()
-                    except ValueError:
-                        pass
-                    data = data.split(':')[0].strip()
-                res[key] = data
-            else:
-                res[key] = data.squeeze()
+        res[key] = _convert_record_field(arr[key], ntype, recarray2dict)
 
     return res
+
+
+class RecordDict(Mapping):
+    """Read-only dictionary view of a numpy record array.
+
+    The fields are converted as by :func:`recarray2dict`, but only when they
+    are accessed, nested records being returned as :class:`RecordDict` too.
+    """
+
+    def __init__(self, arr):
+        """Initialize the view of the record array."""
+        self._arr = arr
+        self._types = {dtuple[0]: dtuple[1] for dtuple in arr.dtype.descr}
+        self._converted = {}
+
+    def __getitem__(self, key):
+        """Get the converted field."""
+        try:
+            return self._converted[key]
+        except KeyError:
+            pass
+        ntype = self._types[key]
+        value = _convert_record_field(self._arr[key], ntype, RecordDict)
+        self._converted[key] = value
+        return value
+
+    def __iter__(self):
+        """Iterate over the field names."""
+        return iter(self._types)
+
+    def __len__(self):
+        """Get the number of fields."""
+        return len(self._types)
+
+
+def _convert_record_field(data, ntype, convert_record):
+    """Convert a field of a record array, using `convert_record` for nested records."""
+    if ntype in _TCDS_TYPES:
+        if data.size > 1:
+            return np.array([timecds2datetime(item)
+                             for item in data.ravel()]).reshape(data.shape)
+        return timecds2datetime(data)
+    elif isinstance(ntype, list):
+        return convert_record(data)
+    elif data.size == 1:
+        data = data[0]
+        if ntype[:2] == '|S':
+            # Python2 and Python3 handle strings differently
+            try:
+                data = data.decode()
+            except ValueError:
+                pass
+            data = data.split(':')[0].strip()
+        return data
+    return data.squeeze()
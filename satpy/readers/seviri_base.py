@@ -32,6 +32,11 @@ from satpy.readers.eum_base import (time_cds_short,
                                     issue_revision)
 from satpy import CHUNK_SIZE
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 PLATFORM_DICT = {
     'MET08': 'Meteosat-8',
     'MET09': 'Meteosat-9',
@@ -236,6 +241,59 @@ def get_cds_time(days, msecs):
     return time
 
 
+def _dec10216_numpy(inbuf):
+    """Decode a contiguous uint8 buffer of 10 bits words with numpy.
+
+    The bytes are only widened to 16 bits when shifted into the output, which
+    avoids an upcast copy of the whole input.
+    """
+    arr10 = inbuf.reshape(-1, 5)
+    arr16 = np.empty((arr10.shape[0], 4), dtype=np.uint16)
+    np.left_shift(arr10[:, 0], 2, out=arr16[:, 0], dtype=np.uint16)
+    arr16[:, 0] |= arr10[:, 1] >> 6
+    np.left_shift(arr10[:, 1] & 63, 4, out=arr16[:, 1], dtype=np.uint16)
+    arr16[:, 1] |= arr10[:, 2] >> 4
+    np.left_shift(arr10[:, 2] & 15, 6, out=arr16[:, 2], dtype=np.uint16)
+    arr16[:, 2] |= arr10[:, 3] >> 2
+    np.left_shift(arr10[:, 3] & 3, 8, out=arr16[:, 3], dtype=np.uint16)
+    arr16[:, 3] |= arr10[:, 4]
+    return arr16.ravel()
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _dec10216_numba(inbuf, outbuf):
+        """Decode a contiguous uint8 buffer of 10 bits words into `outbuf`."""
+        for i in range(inbuf.shape[0] // 5):
+            b0 = np.uint16(inbuf[5 * i])
+            b1 = np.uint16(inbuf[5 * i + 1])
+            b2 = np.uint16(inbuf[5 * i + 2])
+            b3 = np.uint16(inbuf[5 * i + 3])
+            b4 = np.uint16(inbuf[5 * i + 4])
+            outbuf[4 * i] = (b0 << 2) | (b1 >> 6)
+            outbuf[4 * i + 1] = ((b1 & 63) << 4) | (b2 >> 4)
+            outbuf[4 * i + 2] = ((b2 & 15) << 6) | (b3 >> 2)
+            outbuf[4 * i + 3] = ((b3 & 3) << 8) | b4
+
+
+def dec10216_block(inbuf):
+    """Decode a numpy buffer of 10 bits data into 16 bits words.
+
+    The decoding is done along the last axis of `inbuf`. Trailing bytes that
+    do not make up a whole group of 5 are ignored. If numba is available, a
+    compiled (serial) kernel is used, otherwise the decoding is done with
+    numpy. Parallelism comes from dask running this on several blocks at once.
+    """
+    inbuf = np.ascontiguousarray(inbuf[..., :inbuf.shape[-1] // 5 * 5], dtype=np.uint8)
+    shape = inbuf.shape[:-1] + (inbuf.shape[-1] // 5 * 4,)
+    inbuf = inbuf.ravel()
+    if numba is None:
+        return _dec10216_numpy(inbuf).reshape(shape)
+    outbuf = np.empty(shape, dtype=np.uint16)
+    _dec10216_numba(inbuf, outbuf.ravel())
+    return outbuf
+
+
 def dec10216(inbuf):
     """Decode 10 bits data into 16 bits words.
 
@@ -255,27 +313,20 @@ def dec10216(inbuf):
         op[2] = (ip[2] & 0x0F)*64 + ip[3]/4;
         op[3] = (ip[3] & 0x03)*256 +ip[4];
 
-    """
-    arr10 = inbuf.astype(np.uint16)
-    arr16_len = int(len(arr10) * 4 / 5)
-    arr10_len = int((arr16_len * 5) / 4)
-    arr10 = arr10[:arr10_len]  # adjust size
+    The input is decoded chunk by chunk with :func:`dec10216_block`, the
+    chunks being realigned on multiples of 5 bytes beforehand.
 
-    # dask is slow with indexing
-    arr10_0 = arr10[::5]
-    arr10_1 = arr10[1::5]
-    arr10_2 = arr10[2::5]
-    arr10_3 = arr10[3::5]
-    arr10_4 = arr10[4::5]
+    """
+    if not isinstance(inbuf, da.Array):
+        inbuf = da.from_array(inbuf, chunks=len(inbuf))
+    arr10 = inbuf[:len(inbuf) // 5 * 5]  # adjust size to whole groups of 5 bytes
 
-    arr16_0 = (arr10_0 << 2) + (arr10_1 >> 6)
-    arr16_1 = ((arr10_1 & 63) << 4) + (arr10_2 >> 4)
-    arr16_2 = ((arr10_2 & 15) << 6) + (arr10_3 >> 2)
-    arr16_3 = ((arr10_3 & 3) << 8) + arr10_4
-    arr16 = da.stack([arr16_0, arr16_1, arr16_2, arr16_3], axis=-1).ravel()
-    arr16 = da.rechunk(arr16, arr16.shape[0])
+    # each chunk has to contain whole groups of 4 10-bit words
+    chunk_size = max(max(arr10.chunks[0], default=0) // 5, 1) * 5
+    arr10 = arr10.rechunk(chunk_size)
+    chunks = (tuple(size // 5 * 4 for size in arr10.chunks[0]),)
 
-    return arr16
+    return da.map_blocks(dec10216_block, arr10, dtype=np.uint16, chunks=chunks)
 
 
 class MpefProductHeader(object):
@@ -380,9 +431,14 @@ class SEVIRICalibrationHandler(object):
         This uses the method described in Conversion from radiances to
         reflectances for SEVIRI warm channels: https://tinyurl.com/y67zhphm
         """
-        reflectance = np.pi * data * 100.0 / solar_irradiance
+        reflectance = data * self._vis_scale(solar_irradiance)
         return apply_earthsun_distance_correction(reflectance, self.start_time)
 
+    @staticmethod
+    def _vis_scale(solar_irradiance):
+        """Get the factor converting radiance to reflectance (in %), before Sun-Earth distance correction."""
+        return np.pi * 100.0 / solar_irradiance
+
 
 def chebyshev(coefs, time, domain):
     """Evaluate a Chebyshev Polynomial.
@@ -42,21 +42,23 @@ References:
 """
 
 import logging
-from datetime import datetime
+import time
 import numpy as np
 
 import xarray as xr
 import dask.array as da
+from dask import delayed
 
 from satpy import CHUNK_SIZE
 
 from pyresample import geometry
 
 from satpy.readers.file_handlers import BaseFileHandler
-from satpy.readers.eum_base import recarray2dict
+from satpy.readers.eum_base import RecordDict
+from satpy.readers.utils import apply_earthsun_distance_correction
 from satpy.readers.seviri_base import (SEVIRICalibrationHandler,
                                        CHANNEL_NAMES, CALIB, SATNUM,
-                                       dec10216, VISIR_NUM_COLUMNS,
+                                       dec10216_block, VISIR_NUM_COLUMNS,
                                        VISIR_NUM_LINES, HRV_NUM_COLUMNS, HRV_NUM_LINES,
                                        VIS_CHANNELS, get_service_mode, pad_data_horizontally, pad_data_vertically)
 from satpy.readers.seviri_l1b_native_hdr import (GSDTRecords, native_header,
@@ -65,6 +67,10 @@ from satpy.readers._geos_area import get_area_definition
 
 logger = logging.getLogger('native_msg')
 
+# Calibration coefficients in the header are stored for all channels in this order
+_CHANNEL_NAMES_LIST = tuple(CHANNEL_NAMES.values())
+_CHANNEL_INDEX = {name: i for i, name in enumerate(_CHANNEL_NAMES_LIST)}
+
 
 class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
     """SEVIRI native format reader.
@@ -98,12 +104,19 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         self.header = {}
         self.mda = {}
         self.trailer = {}
+        self._is_roi = None
 
         # Read header, prepare dask-array, read trailer and initialize image boundaries
-        # Available channels are known only after the header has been read
-        self._read_header()
-        self.dask_array = da.from_array(self._get_memmap(), chunks=(CHUNK_SIZE,))
-        self._read_trailer()
+        # Available channels are known only after the header has been read.
+        # The header and trailer are read from a single memory map of the file
+        file_map = np.memmap(self.filename, dtype=np.uint8, mode='r')
+        self._read_header(file_map)
+        self._data_dtype = self._get_data_dtype()
+        self._hdr_size = native_header.itemsize
+        self._line_size = self._data_dtype.itemsize
+        self.dask_array = self._get_dask_array()
+        self._read_trailer(file_map)
+        del file_map
         self.image_boundaries = ImageBoundaries(self.header, self.trailer, self.mda)
 
     @property
@@ -123,13 +136,14 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
                                we_offset, ns_offset, column_step, line_step):
         # For Earth model 2 and full disk VISIR, (center_point - west - 0.5 + we_offset) must be -1856.5 .
         # See MSG Level 1.5 Image Data Format Description Figure 7 - Alignment and numbering of the non-HRV pixels.
+        # The bounds may be arrays holding one entry per window, giving one area extent per row.
 
         ll_c = (center_point - east + 0.5 + we_offset) * column_step
         ll_l = (north - center_point + 0.5 + ns_offset) * line_step
         ur_c = (center_point - west - 0.5 + we_offset) * column_step
         ur_l = (south - center_point - 0.5 + ns_offset) * line_step
 
-        return (ll_c, ll_l, ur_c, ur_l)
+        return np.stack((ll_c, ll_l, ur_c, ur_l), axis=-1)
 
     def _get_data_dtype(self):
         """Get the dtype of the file based on the actual available channels."""
@@ -161,38 +175,40 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         visir_rec = get_lrec(int(self.mda['number_of_columns'] * 1.25))
         number_of_visir_channels = len(
             [s for s in self.mda['channel_list'] if not s == 'HRV'])
-        drec = [('visir', (visir_rec, number_of_visir_channels))]
+        # the channel axis is kept even if there is only one VISIR channel
+        drec = [('visir', (visir_rec, (number_of_visir_channels,)))]
 
         if self.mda['available_channels']['HRV']:
             hrv_rec = get_lrec(int(self.mda['hrv_number_of_columns'] * 1.25))
-            drec.append(('hrv', (hrv_rec, 3)))
+            drec.append(('hrv', (hrv_rec, (3,))))
 
         return np.dtype(drec)
 
-    def _get_memmap(self):
-        """Get the memory map for the SEVIRI data."""
-        with open(self.filename) as fp:
-            data_dtype = self._get_data_dtype()
-            hdr_size = native_header.itemsize
+    def _get_dask_array(self):
+        """Get a dask array of the SEVIRI data, memory mapping the file chunk by chunk."""
+        nlines = self.mda['number_of_lines']
+
+        chunks = []
+        for start in range(0, nlines, CHUNK_SIZE):
+            sl = slice(start, min(start + CHUNK_SIZE, nlines))
+            chunk = _load_memmap_chunk(self.filename, self._hdr_size, self._data_dtype, (nlines,), sl)
+            chunks.append(da.from_delayed(chunk, shape=(sl.stop - sl.start,), dtype=self._data_dtype))
 
-            return np.memmap(fp, dtype=data_dtype,
-                             shape=(self.mda['number_of_lines'],),
-                             offset=hdr_size, mode="r")
+        return da.concatenate(chunks)
 
-    def _read_header(self):
+    def _read_header(self, file_map):
         """Read the header info."""
-        data = np.fromfile(self.filename,
-                           dtype=native_header, count=1)
+        data = _read_record(file_map, native_header, 0)
 
-        self.header.update(recarray2dict(data))
+        self.header = RecordDict(data)
 
         data15hd = self.header['15_DATA_HEADER']
         sec15hd = self.header['15_SECONDARY_PRODUCT_HEADER']
 
         # Set the list of available channels:
         self.mda['available_channels'] = get_available_channels(self.header)
-        self.mda['channel_list'] = [i for i in CHANNEL_NAMES.values()
-                                    if self.mda['available_channels'][i]]
+        self.mda['channel_list'] = [name for name, is_available in self.mda['available_channels'].items()
+                                    if is_available]
 
         self.platform_id = data15hd[
             'SatelliteStatus']['SatelliteDefinition']['SatelliteId']
@@ -260,17 +276,12 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         self.mda['hrv_number_of_lines'] = int(sec15hd["NumberLinesHRV"]['Value'])
         self.mda['hrv_number_of_columns'] = cols_hrv
 
-    def _read_trailer(self):
+    def _read_trailer(self, file_map):
 
-        hdr_size = native_header.itemsize
-        data_size = (self._get_data_dtype().itemsize *
-                     self.mda['number_of_lines'])
+        data_size = self._line_size * self.mda['number_of_lines']
+        data = _read_record(file_map, native_trailer, self._hdr_size + data_size)
 
-        with open(self.filename) as fp:
-            fp.seek(hdr_size + data_size)
-            data = np.fromfile(fp, dtype=native_trailer, count=1)
-
-        self.trailer.update(recarray2dict(data))
+        self.trailer = RecordDict(data)
 
     def get_area_def(self, dataset_id):
         """Get the area definition of the band.
@@ -369,24 +380,25 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
             )
             raise NotImplementedError(msg)
 
-        aex_data = {'area_extent': [], 'nlines': [], 'ncolumns': []}
-
         img_bounds = self.image_boundaries.get_img_bounds(dataset_id, self.is_roi())
-        for south_bound, north_bound, east_bound, west_bound in zip(*img_bounds.values()):
+        south_bound, north_bound, east_bound, west_bound = (np.asarray(bounds, dtype=np.int64)
+                                                            for bounds in img_bounds.values())
 
-            if self.fill_disk:
-                east_bound, west_bound = 1, ncolumns_fulldisk
-                if not self.mda['is_full_disk']:
-                    south_bound, north_bound = 1, nlines_fulldisk
+        if self.fill_disk:
+            east_bound = np.full_like(east_bound, 1)
+            west_bound = np.full_like(west_bound, ncolumns_fulldisk)
+            if not self.mda['is_full_disk']:
+                south_bound = np.full_like(south_bound, 1)
+                north_bound = np.full_like(north_bound, nlines_fulldisk)
 
-            nlines = north_bound - south_bound + 1
-            ncolumns = west_bound - east_bound + 1
-            aex = self._calculate_area_extent(center_point, north_bound, east_bound, south_bound, west_bound,
-                                              we_offset, ns_offset, column_step, line_step)
+        nlines = north_bound - south_bound + 1
+        ncolumns = west_bound - east_bound + 1
+        area_extent = self._calculate_area_extent(center_point, north_bound, east_bound, south_bound, west_bound,
+                                                  we_offset, ns_offset, column_step, line_step)
 
-            aex_data['area_extent'].append(aex)
-            aex_data['nlines'].append(nlines)
-            aex_data['ncolumns'].append(ncolumns)
+        aex_data = {'area_extent': [tuple(aex) for aex in area_extent.tolist()],
+                    'nlines': nlines.tolist(),
+                    'ncolumns': ncolumns.tolist()}
 
         return aex_data
 
@@ -395,8 +407,13 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
 
         Standard RSS data consists of 3712 columns and 1392 lines, covering the three northmost segements
         of the SEVIRI disk. Hence, if the data does not cover the full disk, nor the standard RSS region
-        in RSS mode, it's assumed to be ROI data.
+        in RSS mode, it's assumed to be ROI data. The result is computed once and cached.
         """
+        if self._is_roi is None:
+            self._is_roi = self._check_is_roi()
+        return self._is_roi
+
+    def _check_is_roi(self):
         is_rapid_scan = self.trailer['15TRAILER']['ImageProductionStats']['ActualScanningSummary']['ReducedScan']
 
         # Standard RSS data is assumed to cover the three northmost segements, thus consisting of all 3712 columns and
@@ -418,7 +435,7 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         else:
             data = self._get_hrv_channel()
 
-        xarr = xr.DataArray(data, dims=['y', 'x']).where(data != 0).astype(np.float32)
+        xarr = xr.DataArray(data, dims=['y', 'x'])
 
         if xarr is None:
             return None
@@ -443,34 +460,39 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         return dataset
 
     def _get_visir_channel(self, dataset_id):
-        shape = (self.mda['number_of_lines'], self.mda['number_of_columns'])
-        # Check if there is only 1 channel in the list as a change
-        # is needed in the arrray assignment ie channl id is not present
-        if len(self.mda['channel_list']) == 1:
-            raw = self.dask_array['visir']['line_data']
-        else:
-            i = self.mda['channel_list'].index(dataset_id['name'])
-            raw = self.dask_array['visir']['line_data'][:, i, :]
-        data = dec10216(raw.flatten())
-        data = data.reshape(shape)
-        return data
+        i = self.mda['channel_list'].index(dataset_id['name'])
+        return self._decode_lines('visir', (i,))
 
     def _get_hrv_channel(self):
+        # The three HRV lines of each record are decoded together and
+        # interleaved lazily by merging the line and record axes, with
+        # chunks of about CHUNK_SIZE HRV lines
         shape = (self.mda['hrv_number_of_lines'], self.mda['hrv_number_of_columns'])
-        shape_layer = (self.mda['number_of_lines'], self.mda['hrv_number_of_columns'])
+        data = self._decode_lines('hrv', (), max(CHUNK_SIZE // 3, 1))
+        return data.reshape(shape)
 
-        data_list = []
-        for i in range(3):
-            raw = self.dask_array['hrv']['line_data'][:, i, :]
-            data = dec10216(raw.flatten())
-            data = data.reshape(shape_layer)
-            data_list.append(data)
+    def _decode_lines(self, group, key, records_per_chunk=CHUNK_SIZE):
+        """Decode the 10 bits line data of a channel chunk by chunk, keeping whole lines in each chunk.
 
-        return np.stack(data_list, axis=1).reshape(shape)
+        The line data are copied out of the records of each loaded chunk into a contiguous buffer
+        first, so the decoder never works on the strided fields of the records and only the line
+        data of the channel are moved when rechunking to `records_per_chunk` lines.
+        """
+        records = self.dask_array
+        line_data_shape = _extract_line_data(np.empty(0, dtype=records.dtype), group, key).shape
+        new_axis = list(range(1, len(line_data_shape)))
+        chunks = (records.chunks[0],) + tuple((size,) for size in line_data_shape[1:])
+        line_data = da.map_blocks(_copy_line_data, records, group, key, dtype=np.uint8, chunks=chunks,
+                                  new_axis=new_axis)
+        line_data = line_data.rechunk({0: records_per_chunk})
+        chunks = line_data.chunks[:-1] + ((line_data_shape[-1] // 5 * 4,),)
+        return da.map_blocks(dec10216_block, line_data, dtype=np.uint16, chunks=chunks)
 
     def calibrate(self, data, dataset_id):
         """Calibrate the data."""
-        tic = datetime.now()
+        log_time = logger.isEnabledFor(logging.DEBUG)
+        if log_time:
+            tic = time.perf_counter()
 
         data15hdr = self.header['15_DATA_HEADER']
         calibration = dataset_id['calibration']
@@ -479,9 +501,11 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
         # even though all the channels may not be present in the file,
         # the header does have calibration coefficients for all the channels
         # hence, this channel index needs to refer to full channel list
-        i = list(CHANNEL_NAMES.values()).index(channel)
+        i = _CHANNEL_INDEX[channel]
 
         if calibration == 'counts':
+            # counts are kept as integers, zero marking the missing data
+            data.attrs['_FillValue'] = 0
             return data
 
         if calibration in ['radiance', 'reflectance', 'brightness_temperature']:
@@ -503,18 +527,26 @@ class NativeMSGFileHandler(BaseFileHandler, SEVIRICalibrationHandler):
                 gain = coeffs['GSICSCalCoeff'][i]
                 offset = coeffs['GSICSOffsetCount'][i]
                 offset = offset * gain
-            res = self._convert_to_radiance(data, gain, offset)
+
+            # The counts are masked, converted to radiance and, for reflectances,
+            # scaled by the solar irradiance in a single pass over each block
+            scale = 1.0
+            if calibration == 'reflectance':
+                solar_irradiance = CALIB[self.platform_id][channel]["F"]
+                scale = self._vis_scale(solar_irradiance)
+            res = xr.apply_ufunc(_counts_to_radiance, data, gain, offset, scale,
+                                 dask='parallelized', output_dtypes=[np.float32])
 
         if calibration == 'reflectance':
-            solar_irradiance = CALIB[self.platform_id][channel]["F"]
-            res = self._vis_calibrate(res, solar_irradiance)
+            res = apply_earthsun_distance_correction(res, self.start_time)
 
         elif calibration == 'brightness_temperature':
             cal_type = data15hdr['ImageDescription'][
                 'Level15ImageProduction']['PlannedChanProcessing'][i]
             res = self._ir_calibrate(res, channel, cal_type)
 
-        logger.debug("Calibration time " + str(datetime.now() - tic))
+        if log_time:
+            logger.debug("Calibration time %.6f s", time.perf_counter() - tic)
         return res
 
 
@@ -654,13 +686,54 @@ class Padder:
         return data
 
 
+def _counts_to_radiance(counts, gain, offset, scale=1.0):
+    """Convert counts to radiance in a single float32 buffer, masking the zero (no data) counts with NaN.
+
+    The radiance is clipped at zero as in :meth:`SEVIRICalibrationHandler._convert_to_radiance`
+    and multiplied by `scale`.
+    """
+    res = counts.astype(np.float32)
+    res *= gain
+    res += offset
+    np.clip(res, 0.0, None, out=res)
+    if scale != 1.0:
+        res *= scale
+    res[counts == 0] = np.nan
+    return res
+
+
+def _extract_line_data(records, group, key):
+    """Extract the line data of a channel group ('visir' or 'hrv') from the records."""
+    return records[group]['line_data'][(slice(None),) + key]
+
+
+def _copy_line_data(records, group, key):
+    """Copy the line data of a channel to a contiguous buffer."""
+    return np.ascontiguousarray(_extract_line_data(records, group, key))
+
+
+def _read_record(file_map, dtype, offset):
+    """Copy a single record of the given dtype from the byte memory map of a file."""
+    return np.array(file_map[offset:offset + dtype.itemsize].view(dtype))
+
+
+@delayed
+def _load_memmap_chunk(filename, offset, dtype, shape, sl):
+    """Load a chunk of the data from a memory map of the file.
+
+    The memory map is created and discarded in the task itself so that it
+    never has to be shared between workers.
+    """
+    data = np.memmap(filename, dtype=dtype, shape=shape, offset=offset, mode='r')
+    chunk = data[sl]
+    del data
+    return chunk
+
+
 def get_available_channels(header):
     """Get the available channels from the header information."""
     chlist_str = header['15_SECONDARY_PRODUCT_HEADER'][
         'SelectedBandIDs']['Value']
-    retv = {}
-
-    for idx, char in zip(range(12), chlist_str):
-        retv[CHANNEL_NAMES[idx + 1]] = (char == 'X')
+    is_available = np.frombuffer(chlist_str[:12].encode('ascii'), dtype=np.uint8) == ord('X')
 
-    return retv
+    return dict(zip(_CHANNEL_NAMES_LIST, is_available.tolist()))
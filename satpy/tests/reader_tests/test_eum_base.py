@@ -22,7 +22,7 @@ from datetime import datetime
 import numpy as np
 from satpy.readers.eum_base import (timecds2datetime, time_cds_short,
                                     time_cds, time_cds_expanded,
-                                    recarray2dict)
+                                    recarray2dict, RecordDict)
 
 
 class TestMakeTimeCdsDictionary(unittest.TestCase):
@@ -90,3 +90,31 @@ class TestRecarray2Dict(unittest.TestCase):
         }
 
         self.assertEqual(recarray2dict(pat), expected)
+
+
+class TestRecordDict(unittest.TestCase):
+    """Test the lazy dictionary view of record arrays."""
+
+    def test_fun(self):
+        """Test that the fields are converted like recarray2dict does."""
+        hdr_dt = np.dtype([
+            ('PlannedAcquisitionTime', [('TrueRepeatCycleStart', time_cds_expanded)]),
+            ('SelectedBandIDs', [('Name', 'S30'), ('Value', 'S50')]),
+            ('CalSlope', '>f8', (3,)),
+        ])
+        hdr = np.array([(
+            ((21916, 41409544, 305, 262),),
+            (b'SelectedBandIDs: ', b'XXXX--------'),
+            (0.1, 0.2, 0.3))], dtype=hdr_dt)
+
+        res = RecordDict(hdr)
+        self.assertEqual(list(res), ['PlannedAcquisitionTime', 'SelectedBandIDs', 'CalSlope'])
+        self.assertEqual(len(res), 3)
+        self.assertIsInstance(res['PlannedAcquisitionTime'], RecordDict)
+        self.assertEqual(res['PlannedAcquisitionTime']['TrueRepeatCycleStart'],
+                         datetime(2018, 1, 2, 11, 30, 9, 544305))
+        self.assertEqual(res['SelectedBandIDs']['Value'], 'XXXX--------')
+        np.testing.assert_array_equal(res['CalSlope'], recarray2dict(hdr)['CalSlope'])
+        self.assertIs(res['SelectedBandIDs'], res['SelectedBandIDs'])
+        with self.assertRaises(KeyError):
+            res['NotAField']
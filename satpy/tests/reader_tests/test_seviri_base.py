@@ -18,11 +18,12 @@
 """Test the MSG common (native and hrit format) functionionalities."""
 
 import unittest
+from unittest import mock
 import numpy as np
 import xarray as xr
 import dask.array as da
 
-from satpy.readers.seviri_base import dec10216, chebyshev, get_cds_time,\
+from satpy.readers.seviri_base import dec10216, dec10216_block, chebyshev, get_cds_time,\
     get_service_mode, get_padding_area, pad_data_horizontally, pad_data_vertically
 from satpy import CHUNK_SIZE
 
@@ -46,6 +47,32 @@ class SeviriBaseTest(unittest.TestCase):
         exp = np.array([4,  16,  64, 257], dtype=np.uint16)
         np.testing.assert_equal(res, exp)
 
+    def test_dec10216_chunked(self):
+        """Test the dec10216 function on a dask array with misaligned chunks."""
+        inbuf = np.tile(np.array([1, 1, 1, 1, 1], dtype=np.uint8), 7)
+        inbuf = da.from_array(np.append(inbuf, [3, 3]), chunks=8)
+        exp = np.tile(np.array([4,  16,  64, 257], dtype=np.uint16), 7)
+        np.testing.assert_equal(dec10216(inbuf).compute(), exp)
+        with mock.patch('satpy.readers.seviri_base.numba', None):
+            np.testing.assert_equal(dec10216(inbuf).compute(), exp)
+
+    def test_dec10216_numpy(self):
+        """Test the numpy fallback of the dec10216 function."""
+        with mock.patch('satpy.readers.seviri_base.numba', None):
+            res = dec10216_block(np.array([255, 255, 255, 1, 1, 1, 1, 1, 1, 1], dtype=np.uint8))
+        exp = np.array([1023, 1023, 960, 257, 4, 16, 64, 257], dtype=np.uint16)
+        np.testing.assert_equal(res, exp)
+
+    def test_dec10216_block_partial_group(self):
+        """Test that both decoders ignore a partial trailing group of bytes."""
+        inbuf = np.array([[255, 255, 255, 255, 255, 1, 1],
+                          [1, 1, 1, 1, 1, 255, 255]], dtype=np.uint8)
+        exp = np.array([[1023, 1023, 1023, 1023],
+                        [4, 16, 64, 257]], dtype=np.uint16)
+        np.testing.assert_equal(dec10216_block(inbuf), exp)
+        with mock.patch('satpy.readers.seviri_base.numba', None):
+            np.testing.assert_equal(dec10216_block(inbuf), exp)
+
     def test_chebyshev(self):
         """Test the chebyshev function."""
         coefs = [1, 2, 3, 4]
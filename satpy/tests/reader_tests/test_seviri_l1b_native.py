@@ -17,15 +17,21 @@
 # satpy.  If not, see <http://www.gnu.org/licenses/>.
 """Unittesting the Native SEVIRI reader."""
 
+import os
+import tempfile
 import unittest
+from datetime import datetime
 from unittest import mock
 import numpy as np
 import xarray as xr
+import dask.array as da
 
 from satpy.readers.seviri_l1b_native import (
     NativeMSGFileHandler, ImageBoundaries, Padder,
-    get_available_channels,
+    get_available_channels, _counts_to_radiance,
 )
+from satpy.readers.seviri_base import CALIB
+from satpy.readers.seviri_l1b_native_hdr import native_header, native_trailer
 
 from satpy.tests.utils import make_dataid
 
@@ -568,6 +574,112 @@ class TestNativeMSGFileHandler(unittest.TestCase):
         for bandname in AVAILABLE_CHANNELS.keys():
             self.assertTrue(available_chs[bandname])
 
+    @staticmethod
+    def _create_records(group, nlines, packed):
+        """Create a dask array of line records, each holding the packed data of `packed` (one row per channel)."""
+        line_dtype = np.dtype([('line_data', (np.uint8, packed.shape[1]))])
+        dtype = np.dtype([(group, (line_dtype, packed.shape[:1]))])
+        records = np.zeros(nlines, dtype=dtype)
+        records[group]['line_data'][:] = packed
+        return da.from_array(records, chunks=2)
+
+    @mock.patch('satpy.readers.seviri_l1b_native.RecordDict', side_effect=lambda x: {'trailer': x})
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_read_trailer(self, init, record_dict):
+        """Test reading the trailer located after the data records."""
+        trailer = np.frombuffer(np.arange(native_trailer.itemsize, dtype=np.uint16).astype(np.uint8).tobytes(),
+                                dtype=native_trailer)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'native.nat')
+            with open(filename, 'wb') as fh_:
+                fh_.write(np.zeros(native_header.itemsize + 3 * 10, dtype=np.uint8).tobytes())
+                fh_.write(trailer.tobytes())
+            fh = NativeMSGFileHandler()
+            fh.filename = filename
+            fh.mda = {'number_of_lines': 3}
+            fh.trailer = {}
+            fh._hdr_size = native_header.itemsize
+            fh._line_size = 10
+            fh._read_trailer(np.memmap(filename, dtype=np.uint8, mode='r'))
+        self.assertEqual(fh.trailer['trailer'].tobytes(), trailer.tobytes())
+
+    def test_counts_to_radiance(self):
+        """Test the conversion of counts to radiance."""
+        counts = np.array([[0, 1], [5, 1023]], dtype=np.uint16)
+        res = _counts_to_radiance(counts, 0.5, -1.0)
+        self.assertEqual(res.dtype, np.float32)
+        np.testing.assert_allclose(res, np.array([[np.nan, 0.0], [1.5, 510.5]]))
+        res = _counts_to_radiance(counts, 0.5, -1.0, scale=2.0)
+        np.testing.assert_allclose(res, np.array([[np.nan, 0.0], [3.0, 1021.0]]))
+
+    @mock.patch('satpy.readers.seviri_l1b_native.CHUNK_SIZE', 2)
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_get_dask_array(self, init):
+        """Test chunkwise memory mapping of the data records."""
+        data_dtype = np.dtype([('lineno', np.uint32), ('line_data', (np.uint8, 5))])
+        records = np.zeros(5, dtype=data_dtype)
+        records['lineno'] = np.arange(1, 6)
+        records['line_data'] = np.arange(25).reshape(5, 5)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'native.nat')
+            with open(filename, 'wb') as fh_:
+                fh_.write(np.zeros(native_header.itemsize, dtype=np.uint8).tobytes())
+                fh_.write(records.tobytes())
+            fh = NativeMSGFileHandler()
+            fh.filename = filename
+            fh.mda = {'number_of_lines': 5}
+            fh._data_dtype = data_dtype
+            fh._hdr_size = native_header.itemsize
+            res = fh._get_dask_array()
+            self.assertEqual(res.chunks, ((2, 2, 1),))
+            np.testing.assert_array_equal(res.compute(), records)
+
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_get_visir_channel(self, init):
+        """Test decoding of a VISIR channel."""
+        packed = np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                           [1, 1, 1, 1, 1, 255, 255, 255, 255, 255]], dtype=np.uint8)
+        fh = NativeMSGFileHandler()
+        fh.mda = {'channel_list': ['VIS006', 'IR_108']}
+        fh.dask_array = self._create_records('visir', 5, packed)
+        res = fh._get_visir_channel({'name': 'IR_108'})
+        exp = np.tile(np.array([4, 16, 64, 257, 1023, 1023, 1023, 1023], dtype=np.uint16), (5, 1))
+        self.assertIsInstance(res, da.Array)
+        np.testing.assert_array_equal(res.compute(), exp)
+
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_get_visir_channel_single(self, init):
+        """Test decoding of the VISIR channel when it is the only one in the file."""
+        packed = np.array([[1, 1, 1, 1, 1]], dtype=np.uint8)
+        fh = NativeMSGFileHandler()
+        fh.mda = {'channel_list': ['IR_108', 'HRV']}
+        fh.dask_array = self._create_records('visir', 5, packed)
+        res = fh._get_visir_channel({'name': 'IR_108'})
+        exp = np.tile(np.array([4, 16, 64, 257], dtype=np.uint16), (5, 1))
+        np.testing.assert_array_equal(res.compute(), exp)
+
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_get_hrv_channel(self, init):
+        """Test decoding and interleaving of the HRV channel."""
+        packed = np.array([[1, 1, 1, 1, 1],
+                           [0, 0, 0, 0, 0],
+                           [255, 255, 255, 255, 255]], dtype=np.uint8)
+        fh = NativeMSGFileHandler()
+        fh.mda = {'hrv_number_of_lines': 15, 'hrv_number_of_columns': 4}
+        fh.dask_array = self._create_records('hrv', 5, packed)
+        with mock.patch('satpy.readers.seviri_l1b_native.CHUNK_SIZE', 6):
+            res = fh._get_hrv_channel()
+        exp = np.tile(np.array([[4, 16, 64, 257], [0, 0, 0, 0], [1023, 1023, 1023, 1023]], dtype=np.uint16), (5, 1))
+        self.assertIsInstance(res, da.Array)
+        self.assertEqual(res.chunks, ((6, 6, 3), (4,)))
+        np.testing.assert_array_equal(res.compute(), exp)
+
+        # chunks of loaded records not aligned with the decoded chunks
+        with mock.patch('satpy.readers.seviri_l1b_native.CHUNK_SIZE', 9):
+            res = fh._get_hrv_channel()
+        self.assertEqual(res.chunks, ((9, 6), (4,)))
+        np.testing.assert_array_equal(res.compute(), exp)
+
 
 class TestNativeMSGArea(unittest.TestCase):
     """Test NativeMSGFileHandler.get_area_extent.
@@ -701,12 +813,14 @@ class TestNativeMSGArea(unittest.TestCase):
         trailer = self.create_test_trailer(is_rapid_scan)
         expected_area_def = test_dict['expected_area_def']
 
-        with mock.patch('satpy.readers.seviri_l1b_native.np.fromfile') as fromfile:
-            fromfile.return_value = header
-            with mock.patch('satpy.readers.seviri_l1b_native.recarray2dict') as recarray2dict:
-                recarray2dict.side_effect = (lambda x: x)
-                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_memmap') as _get_memmap:
-                    _get_memmap.return_value = np.arange(3)
+        with mock.patch('satpy.readers.seviri_l1b_native.np.memmap'), \
+                mock.patch('satpy.readers.seviri_l1b_native._read_record') as _read_record:
+            _read_record.return_value = header
+            with mock.patch('satpy.readers.seviri_l1b_native.RecordDict') as RecordDict:
+                RecordDict.side_effect = (lambda x: x)
+                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_dask_array') \
+                        as _get_dask_array:
+                    _get_dask_array.return_value = da.arange(3)
                     with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._read_trailer'):
                         fh = NativeMSGFileHandler(None, {}, None)
                         fh.fill_disk = fill_disk
@@ -990,17 +1104,23 @@ class TestNativeMSGArea(unittest.TestCase):
         trailer = self.create_test_trailer(is_rapid_scan)
         expected_is_roi = test_dict['is_roi']
 
-        with mock.patch('satpy.readers.seviri_l1b_native.np.fromfile') as fromfile:
-            fromfile.return_value = header
-            with mock.patch('satpy.readers.seviri_l1b_native.recarray2dict') as recarray2dict:
-                recarray2dict.side_effect = (lambda x: x)
-                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_memmap') as _get_memmap:
-                    _get_memmap.return_value = np.arange(3)
+        with mock.patch('satpy.readers.seviri_l1b_native.np.memmap'), \
+                mock.patch('satpy.readers.seviri_l1b_native._read_record') as _read_record:
+            _read_record.return_value = header
+            with mock.patch('satpy.readers.seviri_l1b_native.RecordDict') as RecordDict:
+                RecordDict.side_effect = (lambda x: x)
+                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_dask_array') \
+                        as _get_dask_array:
+                    _get_dask_array.return_value = da.arange(3)
                     with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._read_trailer'):
                         fh = NativeMSGFileHandler(None, {}, None)
                         fh.header = header
                         fh.trailer = trailer
                         calc_is_roi = fh.is_roi()
+                        # The check is cached and not repeated
+                        with mock.patch.object(fh, '_check_is_roi') as check_is_roi:
+                            self.assertEqual(fh.is_roi(), calc_is_roi)
+                            check_is_roi.assert_not_called()
 
         return (calc_is_roi, expected_is_roi)
 
@@ -1146,12 +1266,14 @@ class TestNativeMSGCalibrationMode(unittest.TestCase):
         is_rapid_scan = test_dict['is_rapid_scan']
         header = self.create_test_header(earth_model, dataset_id, is_full_disk, is_rapid_scan)
 
-        with mock.patch('satpy.readers.seviri_l1b_native.np.fromfile') as fromfile:
-            fromfile.return_value = header
-            with mock.patch('satpy.readers.seviri_l1b_native.recarray2dict') as recarray2dict:
-                recarray2dict.side_effect = (lambda x: x)
-                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_memmap') as _get_memmap:
-                    _get_memmap.return_value = np.arange(3)
+        with mock.patch('satpy.readers.seviri_l1b_native.np.memmap'), \
+                mock.patch('satpy.readers.seviri_l1b_native._read_record') as _read_record:
+            _read_record.return_value = header
+            with mock.patch('satpy.readers.seviri_l1b_native.RecordDict') as RecordDict:
+                RecordDict.side_effect = (lambda x: x)
+                with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._get_dask_array') \
+                        as _get_dask_array:
+                    _get_dask_array.return_value = da.arange(3)
                     with mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler._read_trailer'):
                         # Create an instance of the native msg reader
                         # with the calibration mode to test
@@ -1186,6 +1308,40 @@ class TestNativeMSGCalibrationMode(unittest.TestCase):
         )
         assertNumpyArraysEqual(calculated, expected)
 
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_calibration_counts(self, init):
+        """Test that counts are returned as integers with zero as fill value."""
+        fh = NativeMSGFileHandler()
+        fh.header = {'15_DATA_HEADER': {}}
+        data = xr.DataArray(da.from_array(np.array([[0, 1], [2, 1023]], dtype=np.uint16)), dims=['y', 'x'])
+        res = fh.calibrate(data, make_dataid(name='IR_108', calibration='counts'))
+        self.assertEqual(res.dtype, np.uint16)
+        self.assertEqual(res.attrs['_FillValue'], 0)
+        np.testing.assert_array_equal(res, data)
+
+    @mock.patch('satpy.readers.seviri_l1b_native.apply_earthsun_distance_correction', side_effect=lambda x, y: x)
+    @mock.patch('satpy.readers.seviri_l1b_native.NativeMSGFileHandler.__init__', return_value=None)
+    def test_calibration_raw_counts(self, init, apply_earthsun_distance_correction):
+        """Test calibrating raw integer counts, zero counts being masked."""
+        fh = NativeMSGFileHandler()
+        fh.header = self.create_test_header(1, make_dataid(name='VIS006'), True, 0)
+        fh.header['15_DATA_HEADER']['ImageAcquisition'] = {
+            'PlannedAcquisitionTime': {'TrueRepeatCycleStart': datetime(2020, 1, 1)}}
+        fh.calib_mode = 'nominal'
+        fh.platform_id = 324
+        data = xr.DataArray(da.from_array(np.array([[0, 10], [20, 1023]], dtype=np.uint16)), dims=['y', 'x'])
+        # VIS006: CalSlope 0.1, CalOffset -1.0
+        radiance = np.array([[np.nan, 0.0], [1.0, 101.3]])
+
+        res = fh.calibrate(data, make_dataid(name='VIS006', calibration='radiance'))
+        self.assertEqual(res.dtype, np.float32)
+        np.testing.assert_allclose(res, radiance, rtol=1e-6)
+
+        res = fh.calibrate(data, make_dataid(name='VIS006', calibration='reflectance'))
+        self.assertEqual(res.dtype, np.float32)
+        np.testing.assert_allclose(res, radiance * fh._vis_scale(CALIB[324]['VIS006']['F']), rtol=1e-6)
+        apply_earthsun_distance_correction.assert_called_once()
+
     def test_calibration_mode_dummy(self):
         """Test a dummy calibration mode."""
         # pass in a calibration mode that is not recognised by the reader
@@ -53,7 +53,8 @@ extras_require = {
     'proj': ['pyresample'],
     'pyspectral': ['pyspectral >= 0.10.1'],
     'pyorbital': ['pyorbital >= 1.3.1'],
-    'hrit_msg': ['pytroll-schedule'],
+    'hrit_msg': ['pytroll-schedule', 'numba'],
+    'seviri_l1b_native': ['numba'],
     'nc_nwcsaf_msg': ['netCDF4 >= 1.1.8'],
     'sar_c': ['python-geotiepoints >= 1.1.7', 'gdal'],
     'abi_l1b': ['h5netcdf'],